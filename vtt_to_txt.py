@@ -5,13 +5,32 @@ VTT to TXT Converter
 This script extracts plain text from WebVTT subtitle files (.vtt) and saves
 the content as plain text files (.txt).
 
+The module is fully type-annotated, so it can optionally be compiled to a
+C extension with mypyc (``mypyc vtt_to_txt.py``) for extra speed on very
+large batches; the plain interpreter path works unchanged.
+
 Author: Video Retrieval Project
 License: MIT
 """
 
+import mmap
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
+# Lines to drop: VTT header, blank lines, cue identifiers, timestamps
+_DROP_RE = re.compile(rb'(?m)^(?:WEBVTT\b.*|[ \t]*|\d+|.*-->.*)(?:\r?\n|\Z)')
+# Leading/trailing whitespace on the surviving subtitle lines
+_EDGE_WS_RE = re.compile(rb'(?m)^[ \t]+|[ \t\r]+$')
+_BLANK_RE = re.compile(rb'\n{2,}')
+
+# Prefer statistical encoding detection over trial-decoding a list of encodings
+try:
+    from charset_normalizer import from_bytes as _detect_encoding
+except ImportError:
+    _detect_encoding = None
+
 
 def vtt_to_text(vtt_path: str) -> str:
     """
@@ -23,64 +42,116 @@ def vtt_to_text(vtt_path: str) -> str:
     Returns:
         A string containing the extracted text content.
     """
-    # Attempt multiple encodings to handle different character sets
-    encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'latin1']
-    content = None
-
-    for encoding in encodings:
+    # Memory-map the file and filter at the byte level, so the kernel pages
+    # data in on demand and only the surviving subtitle lines get decoded
+    fd = os.open(vtt_path, os.O_RDONLY)
+    try:
+        try:
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return ""
+
+        with mm:
+            # One pass through the C regex engine instead of a Python
+            # loop of strip/isdigit/in checks per line
+            kept = _DROP_RE.sub(b'', mm)
+    finally:
+        os.close(fd)
+
+    kept = _EDGE_WS_RE.sub(b'', kept)
+    kept = _BLANK_RE.sub(b'\n', kept).strip()
+
+    try:
+        return kept.decode('utf-8')
+    except (UnicodeDecodeError, UnicodeError):
+        pass
+
+    if _detect_encoding is not None:
+        # A 4 KB prefix is enough for confident detection; restrict the
+        # candidates to the encodings actually seen in these subtitles so
+        # short samples are not misdetected as unrelated codepages
+        best = _detect_encoding(
+            kept[:4096], cp_isolation=['utf_8', 'gbk', 'big5', 'latin_1']
+        ).best()
+        encoding = best.encoding if best else 'utf-8'
+        return kept.decode(encoding, errors='replace')
+
+    # Fall back through alternative encodings for non-UTF8 files
+    for encoding in ['utf-8-sig', 'gbk', 'gb2312', 'latin1']:
         try:
-            with open(vtt_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            break
+            return kept.decode(encoding)
         except (UnicodeDecodeError, UnicodeError):
             continue
 
-    if content is None:
-        print(f"  Warning: Unable to read {vtt_path}")
-        return ""
+    print(f"  Warning: Unable to read {vtt_path}")
+    return ""
 
-    lines = content.splitlines()
 
-    text_lines = []
-    for line in lines:
-        line = line.strip()
-        # Skip VTT header and timestamp lines
-        if not line or line == 'WEBVTT' or '-->' in line:
-            continue
-        # Skip lines containing only digits (cue identifiers)
-        if line.isdigit():
-            continue
-        text_lines.append(line)
+def _convert_one(vtt_path: str) -> str:
+    """
+    Convert a single VTT file, writing the .txt sibling.
 
-    return '\n'.join(text_lines)
+    Args:
+        vtt_path: Path to the input VTT file.
 
+    Returns:
+        The name of the converted file (for progress reporting).
+    """
+    vtt_file = Path(vtt_path)
+    txt_file = vtt_file.with_suffix('.txt')
+    text = vtt_to_text(vtt_path)
+
+    # One C-level encode + one large write, skipping TextIOWrapper's
+    # incremental encoding and newline translation
+    txt_file.write_bytes(text.encode('utf-8'))
+
+    return vtt_file.name
 
-def convert_all_vtt(directory: str):
+
+def convert_all_vtt(directory: str) -> None:
     """
     Convert all VTT files in a directory to TXT format.
 
+    Files are discovered lazily with os.scandir and handed to the worker
+    pool as they are found, so conversion starts before the directory
+    listing finishes and the full path list is never materialized.
+
     Args:
         directory: Path to the directory containing VTT files.
     """
-    dir_path = Path(directory)
-    vtt_files = list(dir_path.glob('*.vtt'))
-
-    if not vtt_files:
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
         print(f"No VTT files found in {directory}")
         return
 
-    print(f"Found {len(vtt_files)} VTT files. Starting conversion...")
-
-    for vtt_file in vtt_files:
-        txt_file = vtt_file.with_suffix('.txt')
-        text = vtt_to_text(str(vtt_file))
-
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(text)
-
-        print(f"  {vtt_file.name} -> {txt_file.name}")
-
-    print(f"\nConversion complete. {len(vtt_files)} files processed.")
+    with ProcessPoolExecutor() as executor:
+        futures = {}
+        with entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.name.endswith('.vtt'):
+                    continue
+                futures[executor.submit(_convert_one, entry.path)] = entry.name
+
+        if not futures:
+            print(f"No VTT files found in {directory}")
+            return
+
+        print(f"Found {len(futures)} VTT files. Converting...")
+
+        converted = 0
+        for future in as_completed(futures):
+            # One unreadable file should not abort the rest of the batch
+            try:
+                name = future.result()
+            except Exception as e:
+                print(f"  Warning: Failed to convert {futures[future]}: {e}")
+                continue
+            converted += 1
+            print(f"  {name} -> {Path(name).stem}.txt")
+
+    print(f"\nConversion complete. {converted}/{len(futures)} files processed.")
 
 
 if __name__ == '__main__':
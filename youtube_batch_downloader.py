@@ -8,9 +8,14 @@ YouTube 批量搜索下载工具 - 纪录片优化版
 import os
 import sys
 import csv
+import sqlite3
 import subprocess
 import json
 import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
@@ -18,11 +23,37 @@ from typing import Optional
 # 尝试导入openpyxl，如果失败则使用csv
 try:
     from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
     from openpyxl.styles import Font, Alignment
     EXCEL_AVAILABLE = True
 except ImportError:
     EXCEL_AVAILABLE = False
 
+# 尝试导入pyahocorasick，如果失败则回退到逐个关键词匹配
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 尝试导入yt_dlp库，如果失败则回退到yt-dlp子进程
+try:
+    import yt_dlp
+    YTDLP_API_AVAILABLE = True
+except ImportError:
+    YTDLP_API_AVAILABLE = False
+
+# 尝试导入orjson（C实现，解析快数倍且直接接受bytes），失败则用标准库json
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
 
 # ============ 过滤配置 ============
 # 必须包含的关键词（满足任一即可）
@@ -60,6 +91,129 @@ POLITICAL_KEYWORDS = [
 # 最小时长（4分钟 = 240秒）
 MIN_DURATION_SECONDS = 4 * 60  # 240秒
 
+# 每个搜索词最多取多少条结果
+SEARCH_RESULTS_PER_TERM = 100
+
+# 视频级并发下载数（保持克制，避免触发限流）
+DOWNLOAD_WORKERS = 3
+
+# 文件名中的非法字符（\w保留unicode字母，中文标题不受影响）
+_UNSAFE_CHARS_RE = re.compile(r'[^\w \-.]+', re.UNICODE)
+
+# 搜索结果磁盘缓存：同一搜索词24小时内直接复用，跳过网络请求
+SEARCH_CACHE_TTL_SECONDS = 24 * 3600
+SEARCH_CACHE_PATH = Path.home() / '.ytdl_search_cache.sqlite'
+
+
+def _cache_connect():
+    """打开搜索缓存数据库（每次调用新建连接，天然线程安全）"""
+    db = sqlite3.connect(SEARCH_CACHE_PATH)
+    db.execute(
+        'CREATE TABLE IF NOT EXISTS cache '
+        '(term TEXT PRIMARY KEY, fetched_at REAL, payload BLOB)'
+    )
+    return db
+
+
+def _cache_get(term: str):
+    """读取未过期的搜索缓存，命中返回视频列表，未命中返回None"""
+    try:
+        db = _cache_connect()
+        try:
+            row = db.execute(
+                'SELECT payload FROM cache WHERE term = ? AND fetched_at > ?',
+                (term, time.time() - SEARCH_CACHE_TTL_SECONDS)
+            ).fetchone()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+
+    if row is None:
+        return None
+    try:
+        return _json_loads(row[0])
+    except ValueError:
+        return None
+
+
+def _cache_put(term: str, videos: list):
+    """写入搜索缓存（缓存损坏或不可写时静默跳过）"""
+    try:
+        db = _cache_connect()
+        try:
+            db.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                (term, time.time(), _json_dumps(videos))
+            )
+            db.commit()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        pass
+
+# 新命中率低于该值且连续出现该次数时，认为后续搜索词大量重叠，提前停止
+SEARCH_MIN_NEW_HIT_RATIO = 0.2
+SEARCH_LOW_RATIO_STREAK = 3
+
+# yt_dlp库搜索参数（仅取元数据，不下载）
+_YDL_SEARCH_OPTS = {
+    'quiet': True,
+    'extract_flat': 'in_playlist',
+    'skip_download': True,
+    'socket_timeout': 30,
+}
+
+# YoutubeDL实例不保证线程安全，按线程各持有一个并复用
+_thread_local = threading.local()
+
+
+def _get_search_ydl():
+    """获取当前线程复用的YoutubeDL实例"""
+    ydl = getattr(_thread_local, 'search_ydl', None)
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(_YDL_SEARCH_OPTS)
+        _thread_local.search_ydl = ydl
+    return ydl
+
+
+# 关键词列表是静态的，小写转换在模块加载时做一次，不在匹配热路径里重复
+TITLE_MUST_CONTAIN_LOWER = tuple(k.lower() for k in TITLE_MUST_CONTAIN)
+TITLE_EXCLUDE_KEYWORDS_LOWER = tuple(k.lower() for k in TITLE_EXCLUDE_KEYWORDS)
+POLITICAL_KEYWORDS_LOWER = tuple(k.lower() for k in POLITICAL_KEYWORDS)
+
+_LOWERED_KEYWORDS = {
+    id(TITLE_MUST_CONTAIN): TITLE_MUST_CONTAIN_LOWER,
+    id(TITLE_EXCLUDE_KEYWORDS): TITLE_EXCLUDE_KEYWORDS_LOWER,
+    id(POLITICAL_KEYWORDS): POLITICAL_KEYWORDS_LOWER,
+}
+
+
+def _fmt_duration(duration) -> str:
+    """把秒数格式化为 分:秒，空值返回空字符串"""
+    duration = duration or 0
+    if not duration:
+        return ""
+    minutes = int(duration) // 60
+    seconds = int(duration) % 60
+    return f"{minutes}:{seconds:02d}"
+
+
+def _build_automaton(keywords_lower: tuple):
+    """为已小写的关键词构建Aho-Corasick自动机（单次扫描匹配所有关键词）"""
+    automaton = ahocorasick.Automaton()
+    for kw in keywords_lower:
+        automaton.add_word(kw, True)
+    automaton.make_automaton()
+    return automaton
+
+
+# 按关键词列表预构建自动机，匹配时单次扫描文本即可
+_AUTOMATONS = {}
+if AHOCORASICK_AVAILABLE:
+    for _keywords in (TITLE_MUST_CONTAIN, TITLE_EXCLUDE_KEYWORDS, POLITICAL_KEYWORDS):
+        _AUTOMATONS[id(_keywords)] = _build_automaton(_LOWERED_KEYWORDS[id(_keywords)])
+
 
 class YouTubeDocumentaryDownloader:
     def __init__(self, output_dir: str, max_downloads: int = 50, exclude_dir: str = None):
@@ -67,28 +221,51 @@ class YouTubeDocumentaryDownloader:
         self.max_downloads = max_downloads
         self.downloaded_info = []
         self.filtered_info = []  # 过滤后的视频信息
+        self._record_lock = threading.Lock()  # 并发下载时保护downloaded_info
         self.exclude_titles = set()  # 已下载的视频标题（用于去重）
+        self._exclude_token_sets = []  # 每个已下载标题的分词frozenset
+        self._token_index = {}  # 倒排索引: 词 -> 包含该词的标题下标列表
 
         # 确保输出目录存在
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         # 加载已下载的视频标题用于去重
-        if exclude_dir:
-            exclude_path = Path(exclude_dir)
-            if exclude_path.exists():
-                for mp4 in exclude_path.glob("*.mp4"):
+        # 用os.scandir直接读目录项，不为每个文件构造Path对象
+        if exclude_dir and os.path.isdir(exclude_dir):
+            with os.scandir(exclude_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith('.') or not name.endswith('.mp4'):
+                        continue
                     # 标准化标题用于匹配
-                    title = mp4.stem.lower().strip()
+                    title = name[:-4].lower().strip()
                     self.exclude_titles.add(title)
-                print(f"   📋 已加载 {len(self.exclude_titles)} 个已下载视频用于去重")
+            print(f"   📋 已加载 {len(self.exclude_titles)} 个已下载视频用于去重")
+
+        # 构建倒排索引，去重时只需按候选标题的词查询，无需遍历全部已下载标题。
+        # 标题不超过20个字符的（按原有规则）不可能判为重复，直接不进索引
+        for title in self.exclude_titles:
+            if len(title) <= 20:
+                continue
+            idx = len(self._exclude_token_sets)
+            self._exclude_token_sets.append(frozenset(title.split()))
+            for token in self._exclude_token_sets[idx]:
+                self._token_index.setdefault(token, []).append(idx)
+
+    def _match_keywords(self, text_lower: str, keywords: list) -> bool:
+        """检查已小写的文本是否包含任一关键词"""
+        automaton = _AUTOMATONS.get(id(keywords))
+        if automaton is not None:
+            # Aho-Corasick自动机：O(文本长度)一次扫描，与关键词数量无关
+            return next(automaton.iter(text_lower), None) is not None
+        lowered = _LOWERED_KEYWORDS.get(id(keywords))
+        if lowered is None:
+            lowered = tuple(kw.lower() for kw in keywords)
+        return any(kw in text_lower for kw in lowered)
 
     def _contains_keyword(self, text: str, keywords: list) -> bool:
         """检查文本是否包含任一关键词"""
-        text_lower = text.lower()
-        for kw in keywords:
-            if kw.lower() in text_lower:
-                return True
-        return False
+        return self._match_keywords(text.lower(), keywords)
 
     def _is_excluded(self, title: str) -> bool:
         """检查标题是否应该被排除"""
@@ -113,13 +290,15 @@ class YouTubeDocumentaryDownloader:
     def _is_duplicate(self, title: str) -> bool:
         """检查是否与已下载的视频重复"""
         normalized_title = title.lower().strip()
-        # 检查是否在已下载列表中（模糊匹配）
-        for downloaded in self.exclude_titles:
-            # 如果有30个以上字符相同，认为是重复
-            if len(normalized_title) > 20 and len(downloaded) > 20:
-                # 计算相似度
-                common = set(normalized_title.split()) & set(downloaded.split())
-                if len(common) >= 3:  # 有3个以上相同词
+        if len(normalized_title) <= 20:
+            return False
+        # 通过倒排索引累计与各已下载标题的相同词数（模糊匹配）
+        counts = Counter()
+        for token in frozenset(normalized_title.split()):
+            for idx in self._token_index.get(token, ()):
+                counts[idx] += 1
+                # 有3个以上相同词认为是重复
+                if counts[idx] >= 3:
                     return True
         return False
 
@@ -143,18 +322,22 @@ class YouTubeDocumentaryDownloader:
             title = video.get('title', '')
             uploader = video.get('uploader', '')
 
+            # 标题和上传者只小写一次，后续检查全部复用
+            title_lower = title.lower()
+            uploader_lower = uploader.lower()
+
             # 1. 检查是否重复
-            if self._is_duplicate(title):
+            if self._is_duplicate(title_lower):
                 excluded_by_duplicate += 1
                 continue
 
             # 2. 检查政治敏感内容（标题或上传者）
-            if self._contains_keyword(title, POLITICAL_KEYWORDS) or self._contains_keyword(uploader, POLITICAL_KEYWORDS):
+            if self._match_keywords(title_lower, POLITICAL_KEYWORDS) or self._match_keywords(uploader_lower, POLITICAL_KEYWORDS):
                 excluded_by_political += 1
                 continue
 
-            # 3. 检查标题是否包含必需词汇
-            if not self._is_valid_title(title):
+            # 3. 检查标题是否包含必需词汇（并排除特定词汇）
+            if self._match_keywords(title_lower, TITLE_EXCLUDE_KEYWORDS) or not self._match_keywords(title_lower, TITLE_MUST_CONTAIN):
                 excluded_by_title += 1
                 continue
 
@@ -178,6 +361,101 @@ class YouTubeDocumentaryDownloader:
 
         return filtered
 
+    def _entry_to_video(self, video_info: dict) -> dict:
+        """把yt-dlp的条目转换为内部视频信息字典"""
+        video_id = video_info.get('id', '')
+
+        # 提取上传时间
+        upload_date = video_info.get('upload_date', '')
+        if upload_date:
+            # 格式: YYYYMMDD
+            try:
+                upload_time = datetime.strptime(upload_date, '%Y%m%d').strftime('%Y-%m-%d')
+            except:
+                upload_time = ''
+        else:
+            upload_time = ''
+
+        # 提取观看次数
+        view_count = video_info.get('view_count', 0) or 0
+
+        return {
+            'id': video_id,
+            'title': video_info.get('title', ''),
+            'url': f"https://www.youtube.com/watch?v={video_id}",
+            'duration': video_info.get('duration', 0),
+            'uploader': video_info.get('uploader', ''),
+            'upload_time': upload_time,
+            'views': view_count,
+        }
+
+    def _search_term(self, term: str) -> list:
+        """
+        用yt-dlp搜索单个关键词，返回解析后的视频信息列表
+        """
+        # 搜索结果变化缓慢，TTL内直接用磁盘缓存，完全跳过网络
+        cached = _cache_get(term)
+        if cached is not None:
+            return cached
+
+        search_url = f"ytsearch{SEARCH_RESULTS_PER_TERM}:{term}"
+
+        # 优先用yt_dlp库：省去每次搜索的解释器启动和stdout JSON序列化
+        if YTDLP_API_AVAILABLE:
+            try:
+                info = _get_search_ydl().extract_info(search_url, download=False)
+            except yt_dlp.utils.DownloadError:
+                return []
+            except Exception as e:
+                print(f"   ⚠️ 搜索出错: {term} - {e}")
+                return []
+
+            entries = info.get('entries') or []
+            videos = [self._entry_to_video(entry) for entry in entries if entry]
+            _cache_put(term, videos)
+            return videos
+
+        # 回退到yt-dlp子进程
+        cmd = [
+            'yt-dlp',
+            '--dump-json',
+            '--no-download',
+            '--flat-playlist',
+            search_url
+        ]
+
+        try:
+            # 以bytes读取stdout，逐行解析时再解码，避免先整体unicode解码
+            result = subprocess.run(
+                cmd,
+                capture_output=True,
+                timeout=180
+            )
+        except subprocess.TimeoutExpired:
+            print(f"   ⚠️ 搜索超时: {term}")
+            return []
+        except Exception as e:
+            print(f"   ⚠️ 搜索出错: {term} - {e}")
+            return []
+
+        if result.returncode != 0:
+            return []
+
+        videos = []
+        for line in result.stdout.strip().split(b'\n'):
+            if not line.strip():
+                continue
+
+            try:
+                video_info = _json_loads(line)
+            except ValueError:
+                continue
+
+            videos.append(self._entry_to_video(video_info))
+
+        _cache_put(term, videos)
+        return videos
+
     def search_videos(self, keyword: str, max_results: int = None) -> list:
         """
         使用yt-dlp搜索视频，返回视频信息列表
@@ -190,28 +468,8 @@ class YouTubeDocumentaryDownloader:
         print(f"   搜索数量: {max_results}")
 
         # 扩展搜索：使用多个相关关键词，覆盖不同上传时间
+        # 按 具体->通用 排序：地区词先填充候选池，通用词靠后避免大量重复命中
         search_terms = [
-            # 纪录片类
-            "Hong Kong documentary",
-            "Hong Kong history documentary",
-            "香港纪录片",
-            "Hong Kong culture documentary",
-            "Hong Kong food documentary",
-            "Hong Kong travel documentary",
-            "Hong Kong city documentary",
-            "Hong Kong lifestyle documentary",
-            "Hong Kong urban exploration",
-            "Hong Kong heritage documentary",
-            # 旅游/Vlog类
-            "Hong Kong travel vlog",
-            "Hong Kong tourism guide",
-            "Hong Kong travel guide",
-            "Hong Kong vlog",
-            "Hong Kong trip",
-            "visit Hong Kong",
-            "Hong Kong vacation",
-            "Hong Kong 4K travel",
-            "Hong Kong scenic",
             # 香港各区 - 中西区
             "Kennedy Town Hong Kong travel",
             "Shek Tong Tsui Hong Kong",
@@ -307,6 +565,27 @@ class YouTubeDocumentaryDownloader:
             "Lamma Island Hong Kong vlog",
             "Lantau Island Hong Kong travel",
             "Tung Chung Hong Kong",
+            # 纪录片类
+            "Hong Kong documentary",
+            "Hong Kong history documentary",
+            "香港纪录片",
+            "Hong Kong culture documentary",
+            "Hong Kong food documentary",
+            "Hong Kong travel documentary",
+            "Hong Kong city documentary",
+            "Hong Kong lifestyle documentary",
+            "Hong Kong urban exploration",
+            "Hong Kong heritage documentary",
+            # 旅游/Vlog类
+            "Hong Kong travel vlog",
+            "Hong Kong tourism guide",
+            "Hong Kong travel guide",
+            "Hong Kong vlog",
+            "Hong Kong trip",
+            "visit Hong Kong",
+            "Hong Kong vacation",
+            "Hong Kong 4K travel",
+            "Hong Kong scenic",
             # 综合搜索
             "Hong Kong neighborhoods travel",
             "Hong Kong local guide vlog",
@@ -314,82 +593,42 @@ class YouTubeDocumentaryDownloader:
             "Hong Kong hidden gems travel",
         ]
 
-        all_videos = []
-        seen_ids = set()
-
-        for term in search_terms:
-            if len(all_videos) >= max_results * 3:  # 获取更多以供筛选
-                break
-
-            search_url = f"ytsearch100:{term}"
+        # 以视频id为键收集候选：插入即去重，且保留插入顺序
+        all_videos = {}
+        target = max_results * 3  # 获取更多以供筛选
+        low_ratio_streak = 0  # 新命中率连续过低的搜索词个数
+
+        # 搜索是网络IO密集型，用线程池并发发起，按完成顺序收集
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {executor.submit(self._search_term, term): term for term in search_terms}
+
+            for future in as_completed(futures):
+                results = future.result()
+
+                new_hits = 0
+                for video in results:
+                    video_id = video['id']
+                    if video_id not in all_videos:
+                        all_videos[video_id] = video
+                        new_hits += 1
+
+                # 后面的搜索词越通用，与已有候选的重叠越多；
+                # 新命中率持续过低时提前停止，省掉无效的网络请求
+                if results and new_hits / len(results) < SEARCH_MIN_NEW_HIT_RATIO:
+                    low_ratio_streak += 1
+                else:
+                    low_ratio_streak = 0
 
-            cmd = [
-                'yt-dlp',
-                '--dump-json',
-                '--no-download',
-                '--flat-playlist',
-                search_url
-            ]
-
-            try:
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=180
-                )
-
-                if result.returncode != 0:
-                    continue
-
-                for line in result.stdout.strip().split('\n'):
-                    if line.strip():
-                        try:
-                            video_info = json.loads(line)
-                            video_id = video_info.get('id', '')
-
-                            # 去重
-                            if video_id in seen_ids:
-                                continue
-                            seen_ids.add(video_id)
-
-                            # 提取上传时间
-                            upload_date = video_info.get('upload_date', '')
-                            if upload_date:
-                                # 格式: YYYYMMDD
-                                try:
-                                    upload_time = datetime.strptime(upload_date, '%Y%m%d').strftime('%Y-%m-%d')
-                                except:
-                                    upload_time = ''
-                            else:
-                                upload_time = ''
-
-                            # 提取观看次数
-                            view_count = video_info.get('view_count', 0) or 0
-
-                            all_videos.append({
-                                'id': video_id,
-                                'title': video_info.get('title', ''),
-                                'url': f"https://www.youtube.com/watch?v={video_id}",
-                                'duration': video_info.get('duration', 0),
-                                'uploader': video_info.get('uploader', ''),
-                                'upload_time': upload_time,
-                                'views': view_count,
-                            })
-                        except json.JSONDecodeError:
-                            continue
-
-            except subprocess.TimeoutExpired:
-                print(f"   ⚠️ 搜索超时: {term}")
-                continue
-            except Exception as e:
-                print(f"   ⚠️ 搜索出错: {term} - {e}")
-                continue
+                if len(all_videos) >= target or low_ratio_streak >= SEARCH_LOW_RATIO_STREAK:
+                    # 已达到候选数量（或几乎全是重复），取消尚未开始的搜索
+                    for pending in futures:
+                        pending.cancel()
+                    break
 
         print(f"   搜索完成，获取 {len(all_videos)} 个候选视频")
 
         # 智能过滤
-        filtered_videos = self._filter_videos(all_videos)
+        filtered_videos = self._filter_videos(list(all_videos.values()))
 
         # 按上传时间排序，确保覆盖不同时期的视频
         filtered_videos.sort(key=lambda x: x.get('upload_time', ''))
@@ -407,9 +646,8 @@ class YouTubeDocumentaryDownloader:
         url = video_info['url']
         title = video_info['title']
 
-        # 清理文件名中的非法字符
-        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_', '.')).strip()
-        safe_title = safe_title[:80]
+        # 清理文件名中的非法字符（C级regex替换，而非逐字符Python判断）
+        safe_title = _UNSAFE_CHARS_RE.sub('', title).strip()[:80]
 
         print(f"\n📥 正在下载: {safe_title}")
         print(f"   链接: {url}")
@@ -417,6 +655,7 @@ class YouTubeDocumentaryDownloader:
         cmd = [
             'yt-dlp',
             '-f', 'best[height<=360]',  # 360p快速模式
+            '-N', '4',  # 单视频内并发下载分片
             '-o', str(self.output_dir / f"%(title)s.%(ext)s"),
             '--no-playlist',
             '--no-check-certificate',
@@ -470,14 +709,19 @@ class YouTubeDocumentaryDownloader:
         # 保存过滤后的视频信息（不含下载状态）
         self.filtered_info = [v.copy() for v in videos]
 
-        # 下载每个视频
-        print(f"\n🚀 开始下载 ({len(videos)} 个)...")
+        # 下载每个视频（视频级并发 + 单视频分片并发）
+        print(f"\n🚀 开始下载 ({len(videos)} 个, {DOWNLOAD_WORKERS} 并发)...")
         print(f"📁 保存目录: {self.output_dir}")
 
-        for i, video in enumerate(videos, 1):
-            print(f"\n[{i}/{len(videos)}]", "="*50)
-            self.download_video(video)
-            self.downloaded_info.append(video.copy())
+        completed = 0
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            futures = {executor.submit(self.download_video, video): video for video in videos}
+            for future in as_completed(futures):
+                video = futures[future]
+                with self._record_lock:
+                    completed += 1
+                    print(f"\n[{completed}/{len(videos)}]", "="*50)
+                    self.downloaded_info.append(video.copy())
 
         # 保存记录
         self.save_records(keyword)
@@ -491,66 +735,59 @@ class YouTubeDocumentaryDownloader:
 
         # CSV字段：title, upload_time, uploader, views, duration, web_link
         csv_headers = ['title', 'upload_time', 'uploader', 'views', 'video_length', 'web_link']
-        csv_field_map = {
-            'title': 'title',
-            'upload_time': 'upload_time',
-            'uploader': 'uploader',
-            'views': 'views',
-            'video_length': 'duration',
-            'web_link': 'url',
-        }
 
         # 保存CSV - 优先使用 filtered_info（未下载的也记录）
         csv_path = self.output_dir / f"{base_name}.csv"
         data_to_save = self.filtered_info if self.filtered_info else self.downloaded_info
 
-        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=csv_headers)
-            writer.writeheader()
-
-            for video in data_to_save:
-                row = {}
-                for csv_key, video_key in csv_field_map.items():
-                    value = video.get(video_key, '')
-
-                    # 格式化时长
-                    if csv_key == 'video_length':
-                        duration = value or 0
-                        if duration:
-                            minutes = int(duration) // 60
-                            seconds = int(duration) % 60
-                            value = f"{minutes}:{seconds:02d}"
-                        else:
-                            value = ""
-
-                    # 格式化观看次数
-                    if csv_key == 'views':
-                        value = f"{value:,}" if value else ""
-
-                    row[csv_key] = value
+        # 先拼好全部行，再一次writerows写出
+        rows = [
+            [
+                video.get('title', ''),
+                video.get('upload_time', ''),
+                video.get('uploader', ''),
+                f"{video.get('views'):,}" if video.get('views') else "",  # 格式化观看次数
+                _fmt_duration(video.get('duration', 0)),
+                video.get('url', ''),
+            ]
+            for video in data_to_save
+        ]
 
-                writer.writerow(row)
+        with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(csv_headers)
+            writer.writerows(rows)
 
         print(f"\n📄 CSV记录已保存: {csv_path}")
 
         # 保存Excel (如果可用)
         if EXCEL_AVAILABLE:
             excel_path = self.output_dir / f"{base_name}.xlsx"
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "纪录片合集"
+            # write_only模式逐行流式落盘，不在内存保留Cell对象
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("纪录片合集")
 
-            # 表头
+            # 调整列宽（write_only模式下须在写入行之前设置）
+            ws.column_dimensions['A'].width = 60
+            ws.column_dimensions['B'].width = 15
+            ws.column_dimensions['C'].width = 25
+            ws.column_dimensions['D'].width = 15
+            ws.column_dimensions['E'].width = 12
+            ws.column_dimensions['F'].width = 50
+
+            # 表头（write_only模式加粗需要WriteOnlyCell）
+            header_font = Font(bold=True)
             headers = ['标题', '上传时间', '上传者', '观看次数', '时长', '链接']
-            ws.append(headers)
+            header_row = []
+            for header in headers:
+                cell = WriteOnlyCell(ws, value=header)
+                cell.font = header_font
+                header_row.append(cell)
+            ws.append(header_row)
 
             # 数据
             for video in data_to_save:
-                duration = video.get('duration', 0) or 0
-                if duration:
-                    duration_str = f"{duration // 60}:{duration % 60:02d}"
-                else:
-                    duration_str = ""
+                duration_str = _fmt_duration(video.get('duration', 0))
 
                 views = video.get('views', 0) or 0
                 views_str = f"{views:,}"
@@ -565,19 +802,6 @@ class YouTubeDocumentaryDownloader:
                 ]
                 ws.append(row)
 
-            # 调整列宽
-            ws.column_dimensions['A'].width = 60
-            ws.column_dimensions['B'].width = 15
-            ws.column_dimensions['C'].width = 25
-            ws.column_dimensions['D'].width = 15
-            ws.column_dimensions['E'].width = 12
-            ws.column_dimensions['F'].width = 50
-
-            # 表头样式
-            header_font = Font(bold=True)
-            for cell in ws[1]:
-                cell.font = header_font
-
             wb.save(excel_path)
             print(f"📊 Excel记录已保存: {excel_path}")
 
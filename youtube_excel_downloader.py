@@ -5,16 +5,45 @@ YouTube Excel视频下载工具
 功能：根据Excel文档下载YouTube视频，按编号命名，超长视频分段
 """
 
+import asyncio
+import atexit
+import logging
 import os
+import queue
+import signal
 import sys
+import pickle
+import shutil
 import subprocess
+import tempfile
+import time
 import json
 import re
-from datetime import datetime as dt, timedelta
+from logging.handlers import QueueHandler, QueueListener
+import xml.etree.ElementTree as ET
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime as dt, time as dt_time, timedelta
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import openpyxl
 
+# 尝试导入python-calamine（Rust实现的xlsx解析，比openpyxl快一个数量级），
+# 失败则回退到openpyxl
+try:
+    from python_calamine import CalamineWorkbook
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
+# 尝试导入yt_dlp库：进程内直接调用下载器，省掉每个视频一次
+# 解释器冷启动和extractor初始化；失败则回退到yt-dlp命令行
+try:
+    import yt_dlp
+    YTDLP_API_AVAILABLE = True
+except ImportError:
+    YTDLP_API_AVAILABLE = False
+
 # 添加 deno 到 PATH（yt-dlp 需要）
 DENO_PATH = "/Users/liyutong/.deno/bin"
 if DENO_PATH not in os.environ.get('PATH', ''):
@@ -32,73 +61,196 @@ SEGMENT_DURATION_SECONDS = 10 * 60   # 每段10分钟
 # 下载质量
 VIDEO_QUALITY = "best[height<=360]"
 
+# 并发下载数（可用环境变量DL_WORKERS覆盖）
+DOWNLOAD_WORKERS = int(os.environ.get("DL_WORKERS", "4"))
+
+# 进度输出经内存队列异步写出：下载协程只入队日志记录（纯内存操作），
+# 由单独的监听线程统一刷到stdout，事件循环不会卡在TTY逐行flush上
+_log_queue = queue.Queue(-1)
+_log_listener = QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+_log_listener.start()
+atexit.register(_log_listener.stop)  # 退出前排空队列，日志不丢尾巴
+
+log = logging.getLogger('downloader')
+log.setLevel(logging.INFO)
+log.addHandler(QueueHandler(_log_queue))
+log.propagate = False
+
+# 输出目录已有.mp4文件名的快照：跳过检查用O(1)集合查询，
+# 不为每个视频/分段单独stat一次外置盘
+_existing_files = set()
+
+
+def _scan_existing_files(output_dir: Path) -> None:
+    """一次列目录，建立已有.mp4文件名集合"""
+    _existing_files.clear()
+    with os.scandir(output_dir) as entries:
+        _existing_files.update(e.name for e in entries if e.name.endswith('.mp4'))
+
+# 每行/每个URL都要匹配的正则，模块级预编译一次。
+# 时长的两种字符串格式（"84mins" 与 "20:35"）合并成一个alternation，单次扫描
+_DURATION_RE = re.compile(r'(?:(\d+)\s*mins?)|(?:(\d+):(\d+))', re.IGNORECASE)
+_VIDEO_ID_RE = re.compile(r'(?:v=|/v/|youtu\.be/|watch\?v=)([a-zA-Z0-9_-]{11})')
+
+
+@dataclass(slots=True)
+class VideoRow:
+    """Excel里的一行视频记录
+
+    slots=True去掉每条记录的__dict__：属性访问少一次dict查找，
+    几百行的表省下一截内存。
+    """
+    no: int
+    title: str
+    url: str
+    platform: str
+
+
+# 平台名intern成单例：此后的platform比较先走指针相等的快路径，
+# 从pickle缓存反序列化回来的行也归并到同一份字符串
+_PLATFORMS = {name: sys.intern(name)
+              for name in ('youtube', 'bilibili', 'rthk', 'other')}
+
+# 四个域名合成一个不区分大小写的alternation：单次扫描出结果，
+# 不用先为整条URL分配一份lower副本再做四次子串查找
+_PLATFORM_HOST_RE = re.compile(
+    r'youtube\.com|youtu\.be|bilibili\.com|rthk\.hk', re.IGNORECASE)
+_PLATFORM_BY_HOST = {
+    'youtube.com': _PLATFORMS['youtube'],
+    'youtu.be': _PLATFORMS['youtube'],
+    'bilibili.com': _PLATFORMS['bilibili'],
+    'rthk.hk': _PLATFORMS['rthk'],
+}
+
 
 def get_url_platform(url: str) -> str:
     """判断URL平台类型"""
-    url_str = str(url).lower()
-    if 'youtube.com' in url_str or 'youtu.be' in url_str:
-        return 'youtube'
-    elif 'bilibili.com' in url_str:
-        return 'bilibili'
-    elif 'rthk.hk' in url_str:
-        return 'rthk'
-    else:
-        return 'other'
+    match = _PLATFORM_HOST_RE.search(str(url))
+    if match is None:
+        return _PLATFORMS['other']
+    return _PLATFORM_BY_HOST[match.group().lower()]
+
+
+def _hms_seconds(value) -> int:
+    """datetime/time值按 时:分:秒 换算成秒"""
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+# 按具体类型分派，一次dict查找替代逐个isinstance判断；
+# Excel里常见的时长类型都在表里，字符串走正则慢路径
+_DURATION_DISPATCH = {
+    dt: _hms_seconds,
+    dt_time: _hms_seconds,
+    timedelta: lambda value: int(value.total_seconds()),
+    int: int,
+    float: int,
+}
 
 
 def parse_duration(duration) -> int:
     """解析时长，返回秒数"""
+    handler = _DURATION_DISPATCH.get(type(duration))
+    if handler is not None:
+        return handler(duration)
+
     if duration is None:
         return 0
 
-    if isinstance(duration, dt):
-        # datetime.datetime 或 datetime.time
-        if hasattr(duration, 'hour'):
-            return duration.hour * 3600 + duration.minute * 60 + duration.second
-        return 0
+    # 匹配格式: "84mins" / "20:35" (分:秒)
+    match = _DURATION_RE.search(str(duration))
+    if match:
+        mins, minutes, seconds = match.groups()
+        if mins:
+            return int(mins) * 60
+        return int(minutes) * 60 + int(seconds)
 
-    if isinstance(duration, timedelta):
-        return int(duration.total_seconds())
+    return 0
 
-    if isinstance(duration, (int, float)):
-        return int(duration)
 
-    duration_str = str(duration)
+def format_video_id(url: str) -> str:
+    """从URL提取视频ID"""
+    # 两种YouTube URL模式合并成一个alternation，单次扫描即可
+    match = _VIDEO_ID_RE.search(url)
+    if match:
+        return match.group(1)
 
-    # 匹配格式: "84mins", "23mins", "26mins", "46mins"
-    mins_match = re.search(r'(\d+)\s*mins?', duration_str, re.IGNORECASE)
-    if mins_match:
-        return int(mins_match.group(1)) * 60
+    return None
 
-    # 匹配格式: "20:35" (分:秒)
-    time_match = re.search(r'(\d+):(\d+)', duration_str)
-    if time_match:
-        minutes = int(time_match.group(1))
-        seconds = int(time_match.group(2))
-        return minutes * 60 + seconds
 
-    return 0
+def _build_ydl_opts(outtmpl: str, platform: str) -> Dict:
+    """构建与命令行参数等价的YoutubeDL选项"""
+    opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'noplaylist': True,
+        'nocheckcertificate': True,
+        'merge_output_format': 'mp4',
+        'concurrent_fragment_downloads': 8,  # 对应 -N 8
+        'socket_timeout': 30,
+        'outtmpl': outtmpl,
+    }
+    if platform == 'youtube':
+        # 对应 --remote-components ejs:github（YouTube的JS挑战解算）
+        opts['remote_components'] = ['ejs:github']
+    if platform in ('youtube', 'bilibili'):
+        opts['format'] = VIDEO_QUALITY
+        opts['writesubtitles'] = True
+        opts['subtitleslangs'] = ['en', 'zh-Hans', 'zh-Hant', 'zh']
+        opts['postprocessors'] = [
+            {'key': 'FFmpegSubtitlesConvertor', 'format': 'vtt'},
+        ]
+    return opts
 
 
-def format_video_id(url: str) -> str:
-    """从URL提取视频ID"""
-    # YouTube URL patterns
-    patterns = [
-        r'(?:v=|/v/|youtu\.be/)([a-zA-Z0-9_-]{11})',
-        r'watch\?v=([a-zA-Z0-9_-]{11})',
-    ]
+def _publish_staged_outputs(output_name: str, output_dir: Path) -> None:
+    """把暂存在本地临时目录的成品（mp4和字幕）搬到输出目录
 
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+    shutil.move同盘时退化成rename，跨盘时是一次顺序大拷贝。
+    """
+    staging_dir = Path(tempfile.gettempdir())
+    # 只搬本次会产出的成品（mp4和.lang.vtt字幕）；tmp是共享目录，
+    # 宽泛的glob会把上次崩溃残留的.part之类也捎进输出目录
+    candidates = [staging_dir / f"{output_name}.mp4"]
+    candidates.extend(staging_dir.glob(f"{output_name}.*.vtt"))
+    for path in candidates:
+        if path.exists():
+            shutil.move(str(path), str(output_dir / path.name))
 
-    return None
 
+def _api_download(url: str, opts: Dict, timeout: int = 900) -> Tuple[bool, str]:
+    """
+    在工作线程里用yt_dlp库执行一次下载
+
+    下载是阻塞调用，由asyncio.to_thread丢到线程池执行，
+    事件循环里的其他下载不受影响。
+
+    看门狗用progress hook实现：时限一到，回调在下载线程里抛
+    DownloadCancelled让下载真正终止、线程退出——在外面
+    asyncio.wait_for只会丢弃协程，线程会滞留在线程池里继续写盘。
+
+    Returns:
+        (是否成功, 错误消息文本)；超时抛DownloadCancelled
+    """
+    deadline = time.monotonic() + timeout
+
+    def _deadline_hook(progress):
+        if time.monotonic() > deadline:
+            raise yt_dlp.utils.DownloadCancelled(f'看门狗超时({timeout}s)')
 
-def download_video_segment(url: str, output_name: str, output_dir: Path,
-                          start_time: int = None, end_time: int = None,
-                          platform: str = 'youtube') -> bool:
+    opts = {**opts, 'progress_hooks': [_deadline_hook]}
+    try:
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            ydl.download([url])
+        return True, ''
+    except yt_dlp.utils.DownloadCancelled:
+        raise  # 超时：调用方按超时路径处理
+    except Exception as e:  # DownloadError / ExtractorError 等
+        return False, str(e)
+
+
+async def download_video_segment(url: str, output_name: str, output_dir: Path,
+                                 start_time: int = None, end_time: int = None,
+                                 platform: str = 'youtube') -> bool:
     """
     下载视频片段
 
@@ -114,14 +266,52 @@ def download_video_segment(url: str, output_name: str, output_dir: Path,
     # 构建输出路径
     output_path = output_dir / f"{output_name}.mp4"
 
-    # 如果视频已存在，跳过
-    if output_path.exists():
-        print(f"   ⏭️ 已存在: {output_name}.mp4")
+    # 如果视频已存在，跳过（查快照集合，不stat磁盘）
+    if output_path.name in _existing_files:
+        log.info(f"   ⏭️ 已存在: {output_name}.mp4")
         return True
 
-    print(f"   📥 下载 [{platform}]: {output_name}")
+    log.info(f"   📥 下载 [{platform}]: {output_name}")
+
+    # 先落到本地临时目录：yt-dlp的分片随机写和ffmpeg混流的整文件
+    # 重写都发生在内置盘上，慢速外置盘只承接最后一次顺序大写入
+    staging_path = Path(tempfile.gettempdir()) / output_path.name
+
+    # 优先走进程内yt_dlp库
+    if YTDLP_API_AVAILABLE:
+        opts = _build_ydl_opts(str(staging_path), platform)
+        if platform == 'youtube' and start_time is not None:
+            opts['download_ranges'] = yt_dlp.utils.download_range_func(
+                None,
+                [(start_time, end_time if end_time is not None else float('inf'))],
+            )
+
+        try:
+            # 与命令行路径一样给15分钟看门狗（长视频），不让一个
+            # 只滴不断的下载一直占着并发名额
+            ok, error_msg = await asyncio.to_thread(_api_download, url, opts)
+        except yt_dlp.utils.DownloadCancelled:
+            log.info(f"   ⏰ 超时: {output_name}")
+            return False
+        if ok:
+            await asyncio.to_thread(_publish_staged_outputs, output_name, output_dir)
+            log.info(f"   ✅ 完成: {output_name}")
+            _existing_files.add(output_path.name)
+            return True
+
+        log.info(f"   ❌ 失败: {output_name}")
+        error_lower = error_msg.lower()
+        if 'private video' in error_lower or 'privat' in error_lower:
+            log.info(f"      原因: 私有视频")
+        elif 'is not available' in error_lower or 'unavailable' in error_lower:
+            log.info(f"      原因: 视频不可用")
+        elif 'login required' in error_lower or 'sign in' in error_lower:
+            log.info(f"      原因: 需要登录")
+        elif error_msg:
+            log.info(f"      错误: {error_msg[-200:]}")
+        return False
 
-    # 构建下载命令
+    # 回退：yt-dlp命令行（子进程）
     cmd = ['yt-dlp']
 
     # YouTube特殊参数
@@ -133,10 +323,11 @@ def download_video_segment(url: str, output_name: str, output_dir: Path,
         cmd.extend(['-f', VIDEO_QUALITY])
 
     cmd.extend([
+        '-N', '8',  # 并发下载分片，单连接被限速时仍能吃满带宽
         '--no-playlist',
         '--no-check-certificate',
         '--merge-output-format', 'mp4',
-        '-o', str(output_path),
+        '-o', str(staging_path),
     ])
 
     # 字幕支持（YouTube和Bilibili）
@@ -155,39 +346,225 @@ def download_video_segment(url: str, output_name: str, output_dir: Path,
     cmd.append(url)
 
     try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=900  # 15分钟超时（长视频）
-        )
+        returncode, stderr_tail = await _run_download_cmd(cmd, 900)  # 15分钟超时（长视频）
 
-        if result.returncode == 0:
-            print(f"   ✅ 完成: {output_name}")
+        if returncode == 0:
+            await asyncio.to_thread(_publish_staged_outputs, output_name, output_dir)
+            log.info(f"   ✅ 完成: {output_name}")
+            _existing_files.add(output_path.name)
             return True
         else:
-            print(f"   ❌ 失败: {output_name}")
-            if result.stderr:
-                stderr_lower = result.stderr.lower()
+            log.info(f"   ❌ 失败: {output_name}")
+            if stderr_tail:
+                stderr_lower = stderr_tail.lower()
                 if 'private video' in stderr_lower or 'privat' in stderr_lower:
-                    print(f"      原因: 私有视频")
+                    log.info(f"      原因: 私有视频")
                 elif 'is not available' in stderr_lower:
-                    print(f"      原因: 视频不可用")
+                    log.info(f"      原因: 视频不可用")
                 elif 'login required' in stderr_lower:
-                    print(f"      原因: 需要登录")
+                    log.info(f"      原因: 需要登录")
                 else:
-                    print(f"      错误: {result.stderr[-200:]}")
+                    log.info(f"      错误: {stderr_tail[-200:]}")
             return False
 
-    except subprocess.TimeoutExpired:
-        print(f"   ⏰ 超时: {output_name}")
+    except asyncio.TimeoutError:
+        log.info(f"   ⏰ 超时: {output_name}")
         return False
     except Exception as e:
-        print(f"   ❌ 错误: {output_name} - {e}")
+        log.info(f"   ❌ 错误: {output_name} - {e}")
         return False
 
 
-def process_video(video_no: int, title: str, url: str, output_dir: Path) -> bool:
+async def _stream_probe_durations(urls: List[str], durations: Dict[str, int],
+                                  probed: Dict[str, 'asyncio.Future']) -> None:
+    """
+    批量探测视频时长（仅YouTube需要），边出结果边放行下载
+
+    把所有URL通过stdin喂给同一个yt-dlp进程，N次"解释器启动+探测"
+    坍缩成1次；stdout按 原始URL\\t时长 逐行流出，每解析到一行就
+    resolve对应视频的future。探测（每个一次网络往返）与已放行视频
+    的下载重叠进行，总耗时≈max(探测, 下载)而不是两者之和。
+
+    Args:
+        urls: 要探测的URL列表
+        durations: 共享的 url -> 时长秒数 映射，探测到即写入
+        probed: url -> future，探测出结果（或确定失败）后resolve
+    """
+    log.info(f"⏱️ 批量探测时长 ({len(urls)} 个视频)...")
+
+    async def _pump(proc) -> None:
+        proc.stdin.write("\n".join(urls).encode())
+        await proc.stdin.drain()
+        proc.stdin.close()
+
+        while True:
+            line = await proc.stdout.readline()
+            if not line:
+                break
+            url, _, duration = line.decode('utf-8', 'replace').strip().partition('\t')
+            duration = duration.strip()
+            if duration.isdigit():
+                durations[url] = int(duration)
+            future = probed.get(url)
+            if future is not None and not future.done():
+                future.set_result(True)
+        await proc.wait()
+
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            'yt-dlp',
+            '-a', '-',  # 从stdin读URL列表
+            '--no-download',
+            '--print', '%(original_url)s\t%(duration)s',
+            '--ignore-errors',
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            # 独立进程组：超时连同其子进程一起杀，stdout管道才会关闭
+            start_new_session=True,
+        )
+        try:
+            # 整批探测的总时限：进程卡死时不能让readline()永远挂着，
+            # 否则未resolve的future会把整次运行堵死
+            await asyncio.wait_for(_pump(proc), 300)
+        except asyncio.TimeoutError:
+            log.info("   ⚠️ 时长探测超时")
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+    except Exception as e:
+        log.info(f"   ⚠️ 时长探测出错: {e}")
+    finally:
+        # 没等到结果的视频也放行，由process_video自行兜底探测
+        for future in probed.values():
+            if not future.done():
+                future.set_result(False)
+
+    log.info(f"   探测完成: {len(durations)}/{len(urls)}")
+
+
+async def _run_download_cmd(cmd: List[str], timeout: int):
+    """
+    异步运行一条下载命令
+
+    单个事件循环里每个在途下载只是一个协程，不像线程池那样为了
+    在wait()里睡觉而占一个OS线程。
+
+    Returns:
+        (returncode, stderr尾部文本)；超时时杀掉整个进程组并抛TimeoutError
+    """
+    with tempfile.TemporaryFile() as err:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=err,
+            # nice(5)：ffmpeg混流/JS挑战解算让出CPU，协调进程保持优先级
+            preexec_fn=lambda: os.nice(5),
+            # 独立进程组，超时可以连同yt-dlp拉起的ffmpeg一起杀
+            start_new_session=True,
+        )
+        try:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            # 杀整个进程组：只杀yt-dlp会留下孤儿ffmpeg占着.mp4.part，
+            # 阻塞之后的重试
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await proc.wait()
+            raise
+        err.seek(0)
+        stderr_tail = err.read()[-2048:].decode('utf-8', 'replace')
+
+    return proc.returncode, stderr_tail
+
+
+async def download_video_segments(url: str, video_id_str: str,
+                                  output_dir: Path) -> bool:
+    """
+    整段下载一次，再用ffmpeg流拷贝本地切段（仅YouTube）
+
+    让yt-dlp按--download-sections逐段拉取，同样的字节要从YouTube
+    重新取N次，每段还各跑一遍混流；整体下载一次后本地切割只顺序
+    读一遍文件，-c copy不重新编码，代价接近一次大文件拷贝。
+
+    Args:
+        url: 视频链接
+        video_id_str: 视频编号（如"001"）
+        output_dir: 输出目录
+    """
+    source_path = output_dir / f"{video_id_str}.mp4"
+
+    # 只有源文件已删（成功切完才会删）时才信任 _01 快照跳过；
+    # 源文件还在说明上次切段没收尾，分段可能残缺，必须重切
+    if (f"{video_id_str}_01.mp4" in _existing_files
+            and source_path.name not in _existing_files):
+        log.info(f"   ⏭️ 已存在: {video_id_str}_01.mp4 ...")
+        return True
+
+    # 第一步：完整下载成 001.mp4（已存在则download_video_segment直接跳过）
+    if not await download_video_segment(url, video_id_str, output_dir,
+                                        platform='youtube'):
+        return False
+
+    log.info(f"   ✂️ 本地切段: {video_id_str}")
+
+    # 分段先切到本地临时目录，ffmpeg全部切完才搬进输出目录：
+    # 中途失败/被杀不会在输出目录里留下看似完整的残缺分段集
+    staging_dir = Path(tempfile.gettempdir())
+    for stale in staging_dir.glob(f"{video_id_str}_[0-9][0-9].mp4"):
+        stale.unlink()  # 上次中断的残段不能混进这次的结果
+
+    cmd = [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-i', str(source_path),
+        '-c', 'copy',  # 流拷贝，不重新编码
+        '-map', '0',
+        '-f', 'segment',
+        '-segment_time', str(SEGMENT_DURATION_SECONDS),
+        '-reset_timestamps', '1',
+        '-segment_start_number', '1',
+        str(staging_dir / f"{video_id_str}_%02d.mp4"),
+    ]
+
+    try:
+        returncode, stderr_tail = await _run_download_cmd(cmd, 900)
+    except asyncio.TimeoutError:
+        log.info(f"   ⏰ 切段超时: {video_id_str}")
+        return False
+    except Exception as e:
+        log.info(f"   ❌ 切段错误: {video_id_str} - {e}")
+        return False
+
+    if returncode != 0:
+        log.info(f"   ❌ 切段失败: {video_id_str}")
+        if stderr_tail:
+            log.info(f"      错误: {stderr_tail[-200:]}")
+        return False
+
+    # ffmpeg正常退出后才把整套分段搬进输出目录
+    produced = sorted(path.name for path in
+                      staging_dir.glob(f"{video_id_str}_[0-9][0-9].mp4"))
+    for segment_name in produced:
+        await asyncio.to_thread(
+            shutil.move, str(staging_dir / segment_name),
+            str(output_dir / segment_name))
+    _existing_files.update(produced)
+
+    # 分段齐了，原始整段文件不再保留
+    source_path.unlink(missing_ok=True)
+    _existing_files.discard(source_path.name)
+
+    log.info(f"   ✅ 完成: {video_id_str} ({len(produced)} 段)")
+    return bool(produced)
+
+
+async def process_video(video_no: int, title: str, url: str, output_dir: Path,
+                        durations: Optional[Dict[str, int]] = None) -> bool:
     """
     处理单个视频
 
@@ -196,6 +573,7 @@ def process_video(video_no: int, title: str, url: str, output_dir: Path) -> bool
         title: 视频标题
         url: 视频链接
         output_dir: 输出目录
+        durations: probe_durations预先批量探测的时长映射
 
     Returns:
         是否成功
@@ -205,72 +583,195 @@ def process_video(video_no: int, title: str, url: str, output_dir: Path) -> bool
 
     # 判断平台
     platform = get_url_platform(url)
-    print(f"\n[{video_id_str}] {title[:45]}... [{platform}]")
+    log.info(f"\n[{video_id_str}] {title[:45]}... [{platform}]")
 
-    # 获取视频时长（YouTube和Bilibili支持）
+    # 获取视频时长，优先用批量探测的结果。时长只有YouTube的分段
+    # 判断会用到，其他平台不为它多付一次网络往返
     duration_seconds = 0
-    if platform in ('youtube', 'bilibili'):
-        cmd = [
-            'yt-dlp',
-            '--print', '%(duration)s',
-            '--no-download',
-            url
-        ]
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            if result.returncode == 0 and result.stdout.strip():
-                duration_seconds = int(result.stdout.strip())
-        except:
-            duration_seconds = 0
-
-        print(f"   时长: {duration_seconds // 60}分{duration_seconds % 60}秒")
+    if platform == 'youtube':
+        if durations is not None and url in durations:
+            duration_seconds = durations[url]
+        else:
+            cmd = [
+                'yt-dlp',
+                '--print', '%(duration)s',
+                '--no-download',
+                url
+            ]
+            try:
+                # 兜底探测走工作线程，不阻塞事件循环里的其他下载
+                result = await asyncio.to_thread(
+                    subprocess.run, cmd, capture_output=True, text=True, timeout=30
+                )
+                if result.returncode == 0 and result.stdout.strip():
+                    duration_seconds = int(result.stdout.strip())
+            except:
+                duration_seconds = 0
+
+        log.info(f"   时长: {duration_seconds // 60}分{duration_seconds % 60}秒")
 
     # 确保输出目录存在
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # YouTube长视频需要分段（Bilibili/RTHK不支持分段下载）
     if platform == 'youtube' and duration_seconds > SEGMENT_THRESHOLD_SECONDS:
-        print(f"   ✂️ 需要分段 (>{SEGMENT_THRESHOLD_SECONDS // 60}分钟)")
+        log.info(f"   ✂️ 需要分段 (>{SEGMENT_THRESHOLD_SECONDS // 60}分钟)")
+        return await download_video_segments(url, video_id_str, output_dir)
+    else:
+        # 单段下载
+        return await download_video_segment(url, video_id_str, output_dir, platform=platform)
 
-        num_segments = (duration_seconds + SEGMENT_DURATION_SECONDS - 1) // SEGMENT_DURATION_SECONDS
 
-        success_count = 0
-        for seg_idx in range(num_segments):
-            seg_start = seg_idx * SEGMENT_DURATION_SECONDS
-            seg_end = min((seg_idx + 1) * SEGMENT_DURATION_SECONDS, duration_seconds)
+# spreadsheetml命名空间（xlsx内部XML的标签前缀）
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_SHEET1_XML = 'xl/worksheets/sheet1.xml'
+_SHARED_STRINGS_XML = 'xl/sharedStrings.xml'
 
-            # 格式化分段名称: 001_01, 001_02, etc.
-            seg_name = f"{video_id_str}_{seg_idx + 1:02d}"
 
-            if download_video_segment(url, seg_name, output_dir, seg_start, seg_end, platform):
-                success_count += 1
+def _cell_col_index(cell_ref: str) -> int:
+    """单元格引用转列下标: 'A5' -> 0, 'G12' -> 6"""
+    col = 0
+    for ch in cell_ref:
+        if not ch.isalpha():
+            break
+        col = col * 26 + (ord(ch.upper()) - ord('A') + 1)
+    return col - 1
 
-        print(f"   分段完成: {success_count}/{num_segments}")
-        return success_count > 0
-    else:
-        # 单段下载
-        return download_video_segment(url, video_id_str, output_dir, platform=platform)
 
+def _iter_sheet_rows_xml(excel_path: Path):
+    """
+    直接用zipfile + iterparse流式解析sheet1.xml
 
-def read_excel_videos(excel_path: Path) -> List[Dict]:
-    """读取Excel文件中的视频信息（支持所有平台）"""
-    videos = []
+    xlsx就是一个ZIP里的几份XML；逐<row>解析并随手clear()，内存
+    始终只有当前行，没有openpyxl的单元格对象和样式继承开销。
+    """
+    with zipfile.ZipFile(excel_path) as z:
+        # 共享字符串表（文本单元格按下标引用它）
+        shared_strings = []
+        if _SHARED_STRINGS_XML in z.namelist():
+            with z.open(_SHARED_STRINGS_XML) as f:
+                for _, elem in ET.iterparse(f, events=('end',)):
+                    if elem.tag == _XLSX_NS + 'si':
+                        shared_strings.append(
+                            ''.join(t.text or '' for t in elem.iter(_XLSX_NS + 't'))
+                        )
+                        elem.clear()
+
+        with z.open(_SHEET1_XML) as f:
+            row_number = 0
+            for _, elem in ET.iterparse(f, events=('end',)):
+                if elem.tag != _XLSX_NS + 'row':
+                    continue
+                row_number = int(elem.get('r', row_number + 1))
+
+                cells = {}
+                max_col = -1
+                for cell in elem.iter(_XLSX_NS + 'c'):
+                    col = _cell_col_index(cell.get('r', ''))
+                    if col < 0:
+                        continue
+                    value_el = cell.find(_XLSX_NS + 'v')
+                    if value_el is not None:
+                        if cell.get('t') == 's':
+                            value = shared_strings[int(value_el.text)]
+                        else:
+                            value = value_el.text
+                    else:
+                        # 内联字符串单元格
+                        text_el = cell.find(f'{_XLSX_NS}is/{_XLSX_NS}t')
+                        value = text_el.text if text_el is not None else None
+                    cells[col] = value
+                    max_col = max(max_col, col)
+
+                elem.clear()
+                if row_number > 1:  # 跳过表头
+                    yield [cells.get(col) for col in range(max_col + 1)]
+
+
+def _iter_sheet_rows(excel_path: Path):
+    """
+    逐行产出第一个工作表第2行起的数据行
 
-    wb = openpyxl.load_workbook(excel_path)
-    sheet = wb.active
+    优先calamine（Rust），其次zipfile+iterparse，最后openpyxl。
+    """
+    if CALAMINE_AVAILABLE:
+        # calamine直接返回Python标量的行列表，没有单元格对象开销
+        wb = CalamineWorkbook.from_path(str(excel_path))
+        rows = wb.get_sheet_by_index(0).to_python()
+        yield from rows[1:]
+        return
 
-    print(f"📊 读取Excel文件: {excel_path.name}")
-    print(f"   总行数: {sheet.max_row}")
+    try:
+        with zipfile.ZipFile(excel_path) as z:
+            has_sheet1 = _SHEET1_XML in z.namelist()
+    except zipfile.BadZipFile:
+        has_sheet1 = False
+
+    if has_sheet1:
+        yield from _iter_sheet_rows_xml(excel_path)
+        return
+
+    # read_only: 流式SAX解析，不构建整个工作簿的单元格对象树
+    # data_only: 公式单元格直接取缓存值
+    wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(min_row=2, values_only=True)
+    finally:
+        wb.close()
+
+
+def read_excel_videos(excel_path: Path) -> List[VideoRow]:
+    """
+    读取Excel文件中的视频信息，优先使用磁盘缓存
+
+    Excel文件很少变动，解析结果以(mtime, size)为键缓存在旁边的
+    .cache.pkl里；键匹配时直接pickle.load，跳过整个xlsx解析。
+    """
+    stat = excel_path.stat()
+    cache_key = (stat.st_mtime_ns, stat.st_size)
+    cache_path = excel_path.with_name(excel_path.name + '.cache.pkl')
+
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'rb') as f:
+                cached_key, cached_videos = pickle.load(f)
+            # 旧格式（dict行）的缓存当作失效，重新解析
+            if cached_key == cache_key and (
+                    not cached_videos or isinstance(cached_videos[0], VideoRow)):
+                log.info(f"📊 使用缓存的Excel解析结果 ({len(cached_videos)} 个视频)")
+                # pickle出来的平台名是新字符串对象，归并回interned单例
+                for video in cached_videos:
+                    video.platform = _PLATFORMS.get(video.platform, video.platform)
+                return cached_videos
+        except Exception:
+            pass  # 缓存损坏则重新解析
+
+    videos = _parse_excel_videos(excel_path)
+
+    try:
+        with open(cache_path, 'wb') as f:
+            pickle.dump((cache_key, videos), f, protocol=5)
+    except OSError:
+        pass  # 目录只读时跳过缓存
+
+    return videos
+
+
+def _parse_excel_videos(excel_path: Path) -> List[VideoRow]:
+    """解析Excel文件中的视频信息（支持所有平台）"""
+    videos = []
+
+    log.info(f"📊 读取Excel文件: {excel_path.name}")
 
     youtube_count = 0
     bilibili_count = 0
     rthk_count = 0
     other_count = 0
 
-    for i, row in enumerate(sheet.iter_rows(min_row=2, max_row=sheet.max_row, values_only=True), 2):
-        no = row[0]  # 列A: 编号
-        title = row[1]  # 列B: 标题
-        url = row[6]  # 列G: URL
+    for i, row in enumerate(_iter_sheet_rows(excel_path), 2):
+        no = row[0] if len(row) > 0 else None  # 列A: 编号
+        title = row[1] if len(row) > 1 else None  # 列B: 标题
+        url = row[6] if len(row) > 6 else None  # 列G: URL
 
         if not url:
             continue
@@ -282,12 +783,12 @@ def read_excel_videos(excel_path: Path) -> List[Dict]:
         if platform == 'youtube' and '&list=' in url_str:
             continue
 
-        videos.append({
-            'no': int(no) if no else len(videos) + 1,
-            'title': str(title).strip() if title else f"Video_{len(videos) + 1}",
-            'url': url_str,
-            'platform': platform
-        })
+        videos.append(VideoRow(
+            no=int(no) if no else len(videos) + 1,
+            title=str(title).strip() if title else f"Video_{len(videos) + 1}",
+            url=url_str,
+            platform=platform,
+        ))
 
         if platform == 'youtube':
             youtube_count += 1
@@ -298,37 +799,91 @@ def read_excel_videos(excel_path: Path) -> List[Dict]:
         else:
             other_count += 1
 
-    print(f"   视频统计:")
-    print(f"   - YouTube: {youtube_count}")
-    print(f"   - Bilibili: {bilibili_count}")
-    print(f"   - RTHK: {rthk_count}")
-    print(f"   - Other: {other_count}")
-    print(f"   - 总计: {len(videos)} 个视频\n")
+    log.info(f"   视频统计:")
+    log.info(f"   - YouTube: {youtube_count}")
+    log.info(f"   - Bilibili: {bilibili_count}")
+    log.info(f"   - RTHK: {rthk_count}")
+    log.info(f"   - Other: {other_count}")
+    log.info(f"   - 总计: {len(videos)} 个视频\n")
 
-    wb.close()
     return videos
 
 
+async def _download_all(videos: List[VideoRow]):
+    """
+    并发下载全部视频，时长探测与下载流水线化
+
+    每个视频一个协程，asyncio.Semaphore限制在途数量；子进程完成
+    事件由事件循环统一分发。时长探测作为生产者协程在同一循环里
+    流式推进，每个视频的下载在其时长到达后立刻启动，不等整批
+    探测结束。
+
+    Returns:
+        (成功数, 失败数)
+    """
+    semaphore = asyncio.Semaphore(DOWNLOAD_WORKERS)
+    total = len(videos)
+    completed = 0
+    success_count = 0
+    fail_count = 0
+
+    # 需要探测时长的视频每个挂一个future，探测结果到达时resolve
+    durations: Dict[str, int] = {}
+    loop = asyncio.get_running_loop()
+    probed = {v.url: loop.create_future()
+              for v in videos if v.platform == 'youtube'}
+    probe_task = None
+    if probed:
+        probe_task = asyncio.create_task(
+            _stream_probe_durations(list(probed), durations, probed))
+
+    async def _run_one(video):
+        nonlocal completed, success_count, fail_count
+        # 等自己的探测结果，但不占下载并发名额
+        future = probed.get(video.url)
+        if future is not None:
+            await future
+        async with semaphore:
+            try:
+                ok = await process_video(video.no, video.title, video.url,
+                                         OUTPUT_DIR, durations)
+            except Exception as e:
+                log.info(f"   ❌ 任务异常: {video.no} - {e}")
+                ok = False
+
+        completed += 1
+        if ok:
+            success_count += 1
+        else:
+            fail_count += 1
+        log.info(f"[{completed}/{total}] " + "="*50)
+
+    await asyncio.gather(*(_run_one(video) for video in videos))
+    if probe_task is not None:
+        await probe_task
+    return success_count, fail_count
+
+
 def main():
     """主函数"""
-    print("="*60)
-    print("   Excel 视频下载工具（支持YouTube/B站/RTHK）")
-    print("   功能: 按编号下载 | YouTube超长分段 | 360p | 带字幕")
-    print("="*60)
+    log.info("="*60)
+    log.info("   Excel 视频下载工具（支持YouTube/B站/RTHK）")
+    log.info("   功能: 按编号下载 | YouTube超长分段 | 360p | 带字幕")
+    log.info("="*60)
 
     # 确保输出目录存在
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    print(f"\n📁 输出目录: {OUTPUT_DIR}")
+    log.info(f"\n📁 输出目录: {OUTPUT_DIR}")
 
     # 读取Excel
     if not EXCEL_FILE.exists():
-        print(f"❌ Excel文件不存在: {EXCEL_FILE}")
+        log.info(f"❌ Excel文件不存在: {EXCEL_FILE}")
         sys.exit(1)
 
     videos = read_excel_videos(EXCEL_FILE)
 
     if not videos:
-        print("❌ 未找到视频链接")
+        log.info("❌ 未找到视频链接")
         sys.exit(1)
 
     # 下载每个视频
@@ -336,34 +891,39 @@ def main():
     fail_count = 0
     skip_count = 0
 
-    print("🚀 开始下载...\n")
-
-    for i, video in enumerate(videos, 1):
-        print(f"[{i}/{len(videos)}]", "="*50)
-
-        # 检查是否已存在（跳过已下载的）
-        video_id_str = f"{video['no']:03d}"
-        output_path = OUTPUT_DIR / f"{video_id_str}.mp4"
-        if output_path.exists():
-            print(f"   ⏭️ 已存在: {video_id_str}.mp4")
+    # 一次列目录建立已有文件快照，替代逐视频stat外置盘
+    _scan_existing_files(OUTPUT_DIR)
+
+    # 先过滤掉已存在的视频，事件循环里只处理真正要下载的。
+    # 整段文件和 _01 分段同时在 = 上次切段中断（切完会删整段文件），
+    # 这种不能当已完成跳过，要进流程重切
+    pending = []
+    for video in videos:
+        video_id_str = f"{video.no:03d}"
+        if (f"{video_id_str}.mp4" in _existing_files
+                and f"{video_id_str}_01.mp4" not in _existing_files):
+            log.info(f"   ⏭️ 已存在: {video_id_str}.mp4")
             skip_count += 1
-            continue
-
-        if process_video(video['no'], video['title'], video['url'], OUTPUT_DIR):
-            success_count += 1
         else:
-            fail_count += 1
+            pending.append(video)
+
+    log.info(f"🚀 开始下载... ({DOWNLOAD_WORKERS} 并发)\n")
+
+    # 下载是网络IO密集型：单个事件循环驱动全部yt-dlp子进程，
+    # 并发度由信号量控制，不需要为每个在途下载占一个线程；
+    # 时长探测在同一循环里流式推进，与下载重叠
+    success_count, fail_count = asyncio.run(_download_all(pending))
 
     # 摘要
-    print("\n" + "="*60)
-    print("   下载完成！")
-    print("="*60)
-    print(f"   成功: {success_count}")
-    print(f"   失败: {fail_count}")
-    print(f"   跳过: {skip_count}")
-    print(f"   总计: {len(videos)}")
-    print(f"   输出目录: {OUTPUT_DIR}")
-    print("="*60)
+    log.info("\n" + "="*60)
+    log.info("   下载完成！")
+    log.info("="*60)
+    log.info(f"   成功: {success_count}")
+    log.info(f"   失败: {fail_count}")
+    log.info(f"   跳过: {skip_count}")
+    log.info(f"   总计: {len(videos)}")
+    log.info(f"   输出目录: {OUTPUT_DIR}")
+    log.info("="*60)
 
 
 if __name__ == "__main__":